@@ -11,12 +11,36 @@ The flags that are set by the provides side of this interface are:
   them as complete.
 """
 
+import json
 from operator import attrgetter
 
 from charms.reactive import Endpoint
 from charms.reactive import when
 from charms.reactive import toggle_flag, clear_flag
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    # non-str keys are converted to strings, as the json module does
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(value):
+        return orjson.dumps(value, option=_ORJSON_OPTIONS).decode('utf8')
+    _loads = orjson.loads
+else:
+    def _dumps(value):
+        return json.dumps(value, sort_keys=True)
+    _loads = json.loads
+
+
+def _load_completed(relation):
+    completed = relation.to_publish_raw['completed']
+    return _loads(completed) if completed else {}
+
 
 class GCPIntegrationProvides(Endpoint):
     """
@@ -59,8 +83,14 @@ class GCPIntegrationProvides(Endpoint):
         have been made.
         """
         if not hasattr(self, '_requests'):
-            all_requests = [IntegrationRequest(unit)
-                            for unit in self.all_joined_units]
+            # share the decoded completed maps between the requests, so that
+            # each relation's map is read at most once rather than per unit
+            completed_maps = {}
+            all_requests = []
+            for unit in self.all_joined_units:
+                request = IntegrationRequest(unit)
+                request._completed_maps = completed_maps
+                all_requests.append(request)
             is_changed = attrgetter('is_changed')
             self._requests = list(filter(is_changed, all_requests))
         return self._requests
@@ -100,16 +130,29 @@ class IntegrationRequest:
     """
     A request for integration from a single remote unit.
     """
+    __slots__ = ('_unit', '_completed_maps')
+
     def __init__(self, unit):
         self._unit = unit
+        # decoded completed maps by relation ID, shared between the requests
+        # built by GCPIntegrationProvides.requests
+        self._completed_maps = None
 
     @property
-    def _to_publish(self):
-        return self._unit.relation.to_publish
+    def _to_publish_raw(self):
+        return self._unit.relation.to_publish_raw
 
     @property
     def _completed(self):
-        return self._to_publish.get('completed', {})
+        relation = self._unit.relation
+        if self._completed_maps is None:
+            # not shared with the other requests on this relation, so it
+            # has to be read fresh to pick up their updates
+            return _load_completed(relation)
+        completed_maps = self._completed_maps
+        if relation.relation_id not in completed_maps:
+            completed_maps[relation.relation_id] = _load_completed(relation)
+        return completed_maps[relation.relation_id]
 
     @property
     def _requested(self):
@@ -121,9 +164,15 @@ class IntegrationRequest:
         Whether this request has changed since the last time it was
         marked completed (if ever).
         """
-        if not all([self.charm, self.instance, self.zone, self._requested]):
+        # check the request marker first, since units which haven't made a
+        # request yet shouldn't cost any more than a single lookup
+        requested = self._requested
+        if not requested:
+            return False
+        instance = self.instance
+        if not (instance and self.charm and self.zone):
             return False
-        return self._completed.get(self.instance) != self._requested
+        return self._completed.get(instance) != requested
 
     def mark_completed(self):
         """
@@ -131,7 +180,7 @@ class IntegrationRequest:
         """
         completed = self._completed
         completed[self.instance] = self._requested
-        self._to_publish['completed'] = completed  # have to explicitly update
+        self._to_publish_raw['completed'] = _dumps(completed)
 
     def set_credentials(self, credentials):
         """
@@ -200,8 +249,9 @@ class IntegrationRequest:
         """
         Mapping of label names to values to apply to this instance.
         """
-        # uses dict() here to make a copy, just to be safe
-        return dict(self._unit.received.get('instance-labels', {}))
+        # received values are freshly decoded on every access, so there's no
+        # need to make a defensive copy
+        return self._unit.received['instance-labels'] or {}
 
     @property
     def requested_instance_inspection(self):
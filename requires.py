@@ -19,11 +19,14 @@ The flags that are set by the requires side of this interface are:
 """
 
 
+import json
 import os
 import random
 import string
-from urllib.parse import urljoin
-from urllib.request import urlopen, Request
+from contextlib import contextmanager
+from functools import lru_cache
+from http.client import HTTPConnection, HTTPException
+from urllib.error import HTTPError
 
 from charmhelpers.core import hookenv
 from charmhelpers.core import unitdata
@@ -32,10 +35,72 @@ from charms.reactive import Endpoint
 from charms.reactive import when, when_not
 from charms.reactive import clear_flag, toggle_flag
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# block size to read data from GCP metadata service
-# (realistically, just needs to be bigger than ~20 chars)
-READ_BLOCK_SIZE = 2048
+
+# https://cloud.google.com/compute/docs/storing-retrieving-metadata
+METADATA_HOST = 'metadata.google.internal'
+METADATA_HEADERS = {'Metadata-Flavor': 'Google'}
+# seconds to wait on the metadata service before giving up
+METADATA_TIMEOUT = 10
+
+
+if orjson is not None:
+    # non-str keys are converted to strings, as the json module does
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def _dumps(value):
+        return orjson.dumps(value, option=_ORJSON_OPTIONS).decode('utf8')
+    _loads = orjson.loads
+else:
+    def _dumps(value):
+        return json.dumps(value, sort_keys=True)
+    _loads = json.loads
+
+
+# pre-encoded value for the enable-* request fields
+_ENABLED = _dumps(True)
+
+
+_metadata_conn = None
+
+
+@lru_cache(maxsize=None)
+def _metadata(path):
+    """
+    Fetch a value from the GCP metadata service.
+
+    A single connection to the metadata service is kept open and reused for
+    all lookups, and the results are cached since they will not change for
+    the life of the instance.
+    """
+    global _metadata_conn
+    reused = _metadata_conn is not None
+    if not reused:
+        _metadata_conn = HTTPConnection(METADATA_HOST,
+                                        timeout=METADATA_TIMEOUT)
+    try:
+        _metadata_conn.request('GET', path, headers=METADATA_HEADERS)
+        response = _metadata_conn.getresponse()
+        # the body must be fully read before the connection can be reused
+        body = response.read()
+    except (HTTPException, OSError):
+        # don't leave a broken connection around for the next lookup
+        _metadata_conn.close()
+        _metadata_conn = None
+        if not reused:
+            raise
+        # the kept-alive connection may have been dropped by the server,
+        # so retry once on a fresh connection
+        return _metadata.__wrapped__(path)
+    if response.status != 200:
+        raise HTTPError('http://{}{}'.format(METADATA_HOST, path),
+                        response.status, response.reason,
+                        response.headers, None)
+    return body.decode('utf8').strip()
 
 
 class GCPIntegrationRequires(Endpoint):
@@ -70,16 +135,30 @@ class GCPIntegrationRequires(Endpoint):
         update_config_enable_gcp()
     ```
     """
-    # https://cloud.google.com/compute/docs/storing-retrieving-metadata
-    _metadata_url = 'http://metadata.google.internal/computeMetadata/v1/'
-    _instance_url = urljoin(_metadata_url, 'instance/name')
-    _zone_url = urljoin(_metadata_url, 'instance/zone')
-    _metadata_headers = {'Metadata-Flavor': 'Google'}
+    _metadata_path = '/computeMetadata/v1/'
+    _instance_path = _metadata_path + 'instance/name'
+    _zone_path = _metadata_path + 'instance/zone'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._instance = None
         self._zone = None
+        self._relation_cache = None
+        self._batch = None
+        self._batch_requested = False
+        self._completed_raw = None
+        self._completed_parsed = {}
+
+    @property
+    def _relation(self):
+        """
+        Helper to look up the single relation to the GCP integration
+        application once, since the relations for the endpoint will not
+        change over the course of a single hook.
+        """
+        if self._relation_cache is None:
+            self._relation_cache = self.relations[0]
+        return self._relation_cache
 
     @property
     def _received(self):
@@ -88,7 +167,15 @@ class GCPIntegrationRequires(Endpoint):
         ever be connected to a single GCP integration application with a
         single unit.
         """
-        return self.relations[0].joined_units.received
+        return self._relation.joined_units.received
+
+    @property
+    def _received_raw(self):
+        """
+        Helper to streamline access to the raw (non-JSON decoded) received
+        data.
+        """
+        return self._relation.joined_units.received_raw
 
     @property
     def _to_publish(self):
@@ -97,7 +184,15 @@ class GCPIntegrationRequires(Endpoint):
         ever be connected to a single GCP integration application with a
         single unit.
         """
-        return self.relations[0].to_publish
+        return self._relation.to_publish
+
+    @property
+    def _to_publish_raw(self):
+        """
+        Helper to streamline access to the raw (non-JSON encoded) data to
+        publish.
+        """
+        return self._relation.to_publish_raw
 
     @when('endpoint.{endpoint_name}.joined')
     def send_instance_info(self):
@@ -128,11 +223,7 @@ class GCPIntegrationRequires(Endpoint):
             if cached:
                 self._instance = cached
             else:
-                req = Request(self._instance_url,
-                              headers=self._metadata_headers)
-                with urlopen(req) as fd:
-                    instance = fd.read(READ_BLOCK_SIZE).decode('utf8').strip()
-                    self._instance = instance
+                self._instance = _metadata(self._instance_path)
                 unitdata.kv().set(cache_key, self._instance)
         return self._instance
 
@@ -147,11 +238,8 @@ class GCPIntegrationRequires(Endpoint):
             if cached:
                 self._zone = cached
             else:
-                req = Request(self._zone_url,
-                              headers=self._metadata_headers)
-                with urlopen(req) as fd:
-                    zone = fd.read(READ_BLOCK_SIZE).decode('utf8').strip()
-                    self._zone = zone.split('/')[-1]
+                zone = _metadata(self._zone_path)
+                self._zone = zone.split('/')[-1]
                 unitdata.kv().set(cache_key, self._zone)
         return self._zone
 
@@ -161,20 +249,103 @@ class GCPIntegrationRequires(Endpoint):
         Whether or not the request for this instance has been completed.
         """
         requested = self._to_publish['requested']
-        completed = self._received.get('completed', {}).get(self.instance)
-        return requested and requested == completed
+        if not requested:
+            # nothing has been requested yet, so don't bother decoding the
+            # completed map or looking up the instance
+            return False
+        return requested == self._completed.get(self.instance)
+
+    @property
+    def _completed(self):
+        """
+        The decoded completed map received from the integration charm.
+
+        This is only decoded again if the raw value has changed, since
+        is_ready may be checked several times in a single hook.
+        """
+        raw = self._received_raw['completed']
+        if raw is not self._completed_raw:
+            self._completed_parsed = _loads(raw) if raw else {}
+            self._completed_raw = raw
+        return self._completed_parsed
 
     @property
     def credentials(self):
         return self._received['credentials']
 
     def _request(self, keyvals):
+        to_publish = self._to_publish
+        raw_keyvals = {}
+        for key, value in keyvals.items():
+            if to_publish[key] != value:
+                raw_keyvals[key] = _dumps(value)
+            elif self._batch is not None:
+                # an earlier request in this batch may have changed this
+                # value, and the last request made needs to win
+                self._batch.pop(key, None)
+        if not raw_keyvals and to_publish['requested']:
+            # nothing new is being requested, so keep the pending (or
+            # completed) request rather than issuing a new one
+            return
+        self._publish_request(raw_keyvals)
+
+    def _request_enabled(self, key):
+        to_publish_raw = self._to_publish_raw
+        if to_publish_raw['requested'] and to_publish_raw[key] == _ENABLED:
+            return
+        self._publish_request({key: _ENABLED})
+
+    def _publish_request(self, raw_keyvals):
+        if self._batch is not None:
+            self._batch.update(raw_keyvals)
+            self._batch_requested = True
+            return
         alphabet = string.ascii_letters + string.digits
         nonce = ''.join(random.choice(alphabet) for _ in range(8))
-        self._to_publish.update(keyvals)
+        self._to_publish_raw.update(raw_keyvals)
         self._to_publish['requested'] = nonce
         clear_flag(self.expand_name('ready'))
 
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to combine several requests into a single request.
+
+        Requests made within the block are published together, under a
+        single new request, when the block exits.  If the block raises an
+        exception, the requests made within it are discarded.
+
+        Example usage:
+
+        ```python
+        with gcp.batch():
+            gcp.enable_network_management()
+            gcp.enable_dns_management()
+        ```
+        """
+        if self._batch is not None:
+            # already batching, so the outermost block will publish; but
+            # still discard this block's requests if it raises
+            batched = dict(self._batch)
+            batch_requested = self._batch_requested
+            try:
+                yield self
+            except BaseException:
+                self._batch.clear()
+                self._batch.update(batched)
+                self._batch_requested = batch_requested
+                raise
+            return
+        self._batch = batched = {}
+        self._batch_requested = False
+        try:
+            yield self
+        finally:
+            self._batch = None
+        if batched or (self._batch_requested and
+                       not self._to_publish_raw['requested']):
+            self._publish_request(batched)
+
     def label_instance(self, labels):
         """
         Request that the given labels be applied to this instance.
@@ -182,46 +353,49 @@ class GCPIntegrationRequires(Endpoint):
         # Parameters
         `labels` (dict): Mapping of labels names to values.
         """
-        self._request({'instance-labels': dict(labels)})
+        if not isinstance(labels, dict):
+            # the encoder only handles real dicts, so only copy other mappings
+            labels = dict(labels)
+        self._request({'instance-labels': labels})
 
     def enable_instance_inspection(self):
         """
         Request the ability to inspect instances.
         """
-        self._request({'enable-instance-inspection': True})
+        self._request_enabled('enable-instance-inspection')
 
     def enable_network_management(self):
         """
         Request the ability to manage networking.
         """
-        self._request({'enable-network-management': True})
+        self._request_enabled('enable-network-management')
 
     def enable_security_management(self):
         """
         Request the ability to manage security (e.g., firewalls).
         """
-        self._request({'enable-security-management': True})
+        self._request_enabled('enable-security-management')
 
     def enable_block_storage_management(self):
         """
         Request the ability to manage block storage.
         """
-        self._request({'enable-block-storage-management': True})
+        self._request_enabled('enable-block-storage-management')
 
     def enable_dns_management(self):
         """
         Request the ability to manage DNS.
         """
-        self._request({'enable-dns': True})
+        self._request_enabled('enable-dns')
 
     def enable_object_storage_access(self):
         """
         Request the ability to access object storage.
         """
-        self._request({'enable-object-storage-access': True})
+        self._request_enabled('enable-object-storage-access')
 
     def enable_object_storage_management(self):
         """
         Request the ability to manage object storage.
         """
-        self._request({'enable-object-storage-management': True})
+        self._request_enabled('enable-object-storage-management')
@@ -0,0 +1,100 @@
+import importlib
+import json
+import sys
+from collections import UserDict
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# charms.reactive and charmhelpers only work inside a Juju unit, so replace
+# them with mocks before the interface modules are imported
+for module in ('charmhelpers', 'charmhelpers.core', 'charms',
+               'charms.reactive'):
+    sys.modules.setdefault(module, MagicMock())
+
+
+class Endpoint:
+    def __init__(self, endpoint_name='gcp'):
+        self.endpoint_name = endpoint_name
+        self.relations = []
+
+    def expand_name(self, flag):
+        return 'endpoint.{}.{}'.format(self.endpoint_name, flag)
+
+
+def _decorator(*args, **kwargs):
+    return lambda f: f
+
+
+sys.modules['charms.reactive'].Endpoint = Endpoint
+sys.modules['charms.reactive'].when = _decorator
+sys.modules['charms.reactive'].when_not = _decorator
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class UnitDataView(UserDict):
+    # like charms.reactive.endpoints.UnitDataView
+    def __getitem__(self, key):
+        return self.data.get(key)
+
+
+class JSONUnitDataView(UserDict):
+    # like charms.reactive.endpoints.JSONUnitDataView
+    def __init__(self, data=None):
+        self.data = UnitDataView(data or {})
+
+    def __getitem__(self, key):
+        value = self.data[key]
+        return json.loads(value) if value else value
+
+    def __setitem__(self, key, value):
+        self.data[key] = json.dumps(value, sort_keys=True)
+
+
+class Relation:
+    def __init__(self, relation_id='gcp:0'):
+        self.relation_id = relation_id
+        self.to_publish = JSONUnitDataView()
+        self.joined_units = MagicMock()
+        self.joined_units.received = JSONUnitDataView()
+        self.joined_units.received_raw = self.joined_units.received.data
+
+    @property
+    def to_publish_raw(self):
+        return self.to_publish.data
+
+
+@pytest.fixture
+def relation():
+    return Relation()
+
+
+class Unit:
+    def __init__(self, relation, unit_name, **received):
+        self.relation = relation
+        self.unit_name = unit_name
+        self.received = JSONUnitDataView()
+        for key, value in received.items():
+            self.received[key] = value
+
+
+@pytest.fixture(autouse=True, params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """
+    Run every test with orjson, if it's installed, and with the json
+    fallback, since the interface uses whichever is available.
+    """
+    import provides
+    import requires
+
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setitem(sys.modules, 'orjson', None)
+    importlib.reload(requires)
+    importlib.reload(provides)
+    yield request.param
+    monkeypatch.undo()
+    importlib.reload(requires)
+    importlib.reload(provides)
@@ -0,0 +1,82 @@
+import pytest
+
+import provides
+from conftest import Unit
+
+
+def make_unit(relation, number, **received):
+    return Unit(relation, 'unit/{}'.format(number), **received)
+
+
+def make_request_unit(relation, number, requested):
+    return make_unit(relation, number,
+                     charm='charm', instance='i{}'.format(number),
+                     zone='zone', requested=requested)
+
+
+@pytest.fixture
+def gcp(relation):
+    endpoint = provides.GCPIntegrationProvides()
+    endpoint.relations = [relation]
+    endpoint.all_joined_units = []
+    return endpoint
+
+
+def test_standalone_requests_mark_completed(relation):
+    requests = [provides.IntegrationRequest(make_request_unit(relation, n,
+                                                              'n{}'.format(n)))
+                for n in (1, 2)]
+    assert all(request.is_changed for request in requests)
+    for request in requests:
+        request.mark_completed()
+    assert relation.to_publish['completed'] == {'i1': 'n1', 'i2': 'n2'}
+    assert not any(request.is_changed for request in requests)
+
+
+def test_completed_not_read_without_requests(gcp, relation, monkeypatch):
+    gcp.all_joined_units = [make_unit(relation, 1, charm='charm')]
+
+    def fail(relation):
+        raise AssertionError('completed map read')
+
+    monkeypatch.setattr(provides, '_load_completed', fail)
+    assert gcp.requests == []
+
+
+def test_requests_filtered(gcp, relation):
+    relation.to_publish['completed'] = {'i3': 'n3'}
+    gcp.all_joined_units = [
+        make_request_unit(relation, 1, 'n1'),
+        make_unit(relation, 2, charm='charm', instance='i2', zone='zone'),
+        make_request_unit(relation, 3, 'n3'),
+        make_unit(relation, 4, instance='i4', requested='n4'),
+    ]
+    assert [request.unit_name for request in gcp.requests] == ['unit/1']
+
+
+def test_mark_completed_multiple_units(gcp, relation):
+    relation.to_publish['completed'] = {'i0': 'n0'}
+    gcp.all_joined_units = [make_request_unit(relation, n, 'n{}'.format(n))
+                            for n in (1, 2, 3)]
+    assert len(gcp.requests) == 3
+    gcp.mark_completed()
+    assert gcp.requests == []
+    assert relation.to_publish['completed'] == {
+        'i0': 'n0', 'i1': 'n1', 'i2': 'n2', 'i3': 'n3'}
+    # a fresh endpoint reading the published data sees nothing pending
+    del gcp._requests
+    assert gcp.requests == []
+
+
+@pytest.mark.parametrize('received', [{}, {'instance-labels': None}])
+def test_instance_labels_missing(relation, received):
+    request = provides.IntegrationRequest(make_unit(relation, 1, **received))
+    assert request.instance_labels == {}
+
+
+def test_instance_labels(relation):
+    unit = make_unit(relation, 1, **{'instance-labels': {'x': '1'}})
+    request = provides.IntegrationRequest(unit)
+    assert request.instance_labels == {'x': '1'}
+    request.instance_labels['y'] = '2'
+    assert request.instance_labels == {'x': '1'}
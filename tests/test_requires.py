@@ -0,0 +1,156 @@
+from http.client import RemoteDisconnected
+from unittest.mock import MagicMock
+from urllib.error import HTTPError
+
+import pytest
+
+import requires
+
+
+@pytest.fixture
+def gcp(relation):
+    endpoint = requires.GCPIntegrationRequires()
+    endpoint.relations = [relation]
+    return endpoint
+
+
+def test_enable_published(gcp):
+    gcp.enable_dns_management()
+    assert gcp._to_publish_raw['enable-dns'] == 'true'
+    assert gcp._to_publish['enable-dns'] is True
+    requested = gcp._to_publish['requested']
+    assert requested
+    gcp.enable_dns_management()
+    assert gcp._to_publish['requested'] == requested
+    gcp.enable_network_management()
+    assert gcp._to_publish['enable-network-management'] is True
+    assert gcp._to_publish['requested'] != requested
+
+
+def test_repeated_request_not_reissued(gcp, monkeypatch):
+    clear_flag = MagicMock()
+    monkeypatch.setattr(requires, 'clear_flag', clear_flag)
+    gcp.label_instance({'x': '1'})
+    requested = gcp._to_publish['requested']
+    assert requested
+    clear_flag.assert_called_once_with('endpoint.gcp.ready')
+    gcp.label_instance({'x': '1'})
+    assert gcp._to_publish['requested'] == requested
+    assert clear_flag.call_count == 1
+    gcp.label_instance({'x': '2'})
+    assert gcp._to_publish['requested'] != requested
+    assert clear_flag.call_count == 2
+
+
+def test_request_only_writes_changed_values(gcp):
+    # published by an earlier version, with the json module's separators
+    gcp._to_publish_raw['instance-labels'] = '{"x": "1"}'
+    gcp._to_publish_raw['requested'] = '"nonce"'
+    gcp.label_instance({'x': '1'})
+    assert gcp._to_publish_raw['instance-labels'] == '{"x": "1"}'
+    assert gcp._to_publish['requested'] == 'nonce'
+    gcp.label_instance({'x': '2'})
+    assert gcp._to_publish['instance-labels'] == {'x': '2'}
+    assert gcp._to_publish['requested'] != 'nonce'
+
+
+def test_batch_single_request(gcp):
+    gcp.label_instance({'x': '1'})
+    requested = gcp._to_publish['requested']
+    with gcp.batch():
+        gcp.enable_network_management()
+        gcp.enable_dns_management()
+        assert gcp._to_publish['requested'] == requested
+        assert gcp._to_publish['enable-dns'] is None
+    assert gcp._to_publish['requested'] != requested
+    assert gcp._to_publish['enable-network-management'] is True
+    assert gcp._to_publish['enable-dns'] is True
+
+
+def test_batch_last_request_wins(gcp):
+    gcp.label_instance({'x': '0'})
+    with gcp.batch():
+        gcp.label_instance({'x': '1'})
+        gcp.label_instance({'x': '0'})
+    assert gcp._to_publish['instance-labels'] == {'x': '0'}
+
+
+def test_batch_discarded_on_error(gcp):
+    with pytest.raises(ValueError):
+        with gcp.batch():
+            gcp.enable_dns_management()
+            raise ValueError()
+    assert gcp._to_publish['enable-dns'] is None
+    assert gcp._to_publish['requested'] is None
+
+
+def test_nested_batch_discarded_on_error(gcp):
+    with gcp.batch():
+        gcp.enable_network_management()
+        try:
+            with gcp.batch():
+                gcp.enable_dns_management()
+                raise ValueError()
+        except ValueError:
+            pass
+    assert gcp._to_publish['enable-network-management'] is True
+    assert gcp._to_publish['enable-dns'] is None
+
+
+@pytest.fixture
+def metadata_conn(monkeypatch):
+    connections = []
+
+    def connect(*args, **kwargs):
+        conn = MagicMock()
+        conn.getresponse.return_value.status = 200
+        conn.getresponse.return_value.read.return_value = b'my-instance\n'
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(requires, 'HTTPConnection', connect)
+    monkeypatch.setattr(requires, '_metadata_conn', None)
+    requires._metadata.cache_clear()
+    yield connections
+    requires._metadata.cache_clear()
+
+
+def test_metadata_connection_reused(metadata_conn):
+    assert requires._metadata('/a') == 'my-instance'
+    assert requires._metadata('/b') == 'my-instance'
+    assert requires._metadata('/b') == 'my-instance'
+    assert len(metadata_conn) == 1
+    assert metadata_conn[0].request.call_count == 2
+
+
+def test_metadata_stale_connection_retried(metadata_conn):
+    requires._metadata('/a')
+    metadata_conn[0].getresponse.side_effect = RemoteDisconnected()
+    assert requires._metadata('/b') == 'my-instance'
+    assert len(metadata_conn) == 2
+    metadata_conn[0].close.assert_called_once_with()
+
+
+def test_metadata_failed_connection_dropped(metadata_conn, monkeypatch):
+    def refuse(*args, **kwargs):
+        conn = MagicMock()
+        conn.request.side_effect = ConnectionRefusedError()
+        return conn
+
+    monkeypatch.setattr(requires, 'HTTPConnection', refuse)
+    with pytest.raises(ConnectionRefusedError):
+        requires._metadata('/a')
+    assert requires._metadata_conn is None
+
+
+def test_metadata_error_status(metadata_conn):
+    requires._metadata('/a')
+    metadata_conn[0].getresponse.return_value.status = 404
+    with pytest.raises(HTTPError):
+        requires._metadata('/b')
+
+
+def test_label_non_str_keys(gcp, encoder):
+    gcp.label_instance({1: 'a'})
+    assert gcp._to_publish['instance-labels'] == {'1': 'a'}
+    assert (requires.orjson is None) == (encoder == 'json')